@@ -0,0 +1,157 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from .settings import get_settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_MISSING = object()
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive upstream failures.
+
+    While open, calls fail immediately (or return the last good result for the
+    same key). After `cooldown` seconds one trial call is let through
+    (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        cooldown: float = 30.0,
+        trips: Optional[Callable[[BaseException], bool]] = None,
+        max_cached: int = 256,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self._trips = trips or (lambda e: True)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._served_stale = 0
+        self._last_good: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._max_cached = max_cached
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+        return self._state
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._rejected += 1
+            return False
+
+    def _on_success(self, key: Optional[Hashable], result: Any) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+            if key is not None:
+                self._last_good[key] = result
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > self._max_cached:
+                    self._last_good.popitem(last=False)
+
+    def _on_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+            if not self._trips(error):
+                if self._state == HALF_OPEN:
+                    self._state = CLOSED
+                    self._failures = 0
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def _reject(self, key: Optional[Hashable]):
+        with self._lock:
+            cached = self._last_good.get(key, _MISSING) if key is not None else _MISSING
+            if cached is not _MISSING:
+                self._served_stale += 1
+                return cached
+            retry_after = max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    async def call(self, key: Optional[Hashable], fn, *args, **kwargs):
+        """Run `fn` through the breaker. Pass `key=None` for writes (no fallback)."""
+        if not self._acquire():
+            return self._reject(key)
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        except BaseException:
+            with self._lock:
+                self._trial_in_flight = False
+            raise
+        self._on_success(key, result)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "failures": self._failures,
+                "failureThreshold": self.failure_threshold,
+                "cooldownSeconds": self.cooldown,
+                "retryAfterSeconds": (
+                    round(max(0.0, self.cooldown - (time.monotonic() - self._opened_at)), 3)
+                    if state == OPEN
+                    else 0.0
+                ),
+                "rejected": self._rejected,
+                "servedStale": self._served_stale,
+            }
+
+
+_registry: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, trips: Optional[Callable[[BaseException], bool]] = None) -> CircuitBreaker:
+    with _registry_lock:
+        b = _registry.get(name)
+        if b is None:
+            threshold, cooldown = get_settings().breaker(name.split(":", 1)[0])
+            b = _registry[name] = CircuitBreaker(name, failure_threshold=threshold, cooldown=cooldown, trips=trips)
+        return b
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        breakers = list(_registry.values())
+    return {b.name: b.snapshot() for b in sorted(breakers, key=lambda b: b.name)}
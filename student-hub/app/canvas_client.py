@@ -1,68 +1,97 @@
-import os
-from datetime import datetime
+import asyncio
+from datetime import datetime, timezone
 from typing import List, Optional
 
-import requests
-
+from .breaker import get_breaker
+from .http_client import get_client, is_upstream_failure
 from .models import AcademicItem
+from .search import index_academic, prune
+from .settings import get_settings
+from .singleflight import flight, make_key
+
+
+_ASSIGNMENTS_PER_PAGE = 50
 
 
 def _base() -> str:
-    b = os.getenv("CANVAS_BASE_URL", "").rstrip("/")
+    b = get_settings().canvas_base_url
     if not b:
         raise RuntimeError("CANVAS_BASE_URL missing")
     return b
 
 
 def _headers() -> dict:
-    t = os.getenv("CANVAS_TOKEN", "")
+    t = get_settings().canvas_token
     if not t:
         raise RuntimeError("CANVAS_TOKEN missing")
     return {"Authorization": f"Bearer {t}"}
 
 
-def _get(path: str, params: dict | None = None):
+async def _fetch_json(path: str, params: dict | None = None):
     url = _base() + path
-    r = requests.get(url, headers=_headers(), params=params, timeout=30)
+    r = await get_client().get(url, headers=_headers(), params=params)
     r.raise_for_status()
     return r.json()
 
 
-def list_upcoming_assignments(
+async def _get(path: str, params: dict | None = None):
+    key = make_key("canvas", path, params)
+    breaker = get_breaker("canvas", trips=is_upstream_failure)
+    return await flight.ado(key, breaker.call, key, _fetch_json, path, params)
+
+
+async def list_upcoming_assignments(
     due_after: Optional[datetime], due_before: Optional[datetime], limit: int = 50
 ) -> List[AcademicItem]:
-    courses = _get("/api/v1/courses", params={"enrollment_state": "active", "per_page": 100})
-    items: List[AcademicItem] = []
-
-    for c in courses:
-        course_id = c.get("id")
-        course_code = c.get("course_code") or c.get("name")
-        if not course_id:
-            continue
+    courses = await _get("/api/v1/courses", params={"enrollment_state": "active", "per_page": 100})
+    courses = [c for c in courses if c.get("id")]
 
-        assigns = _get(
-            f"/api/v1/courses/{course_id}/assignments", params={"bucket": "upcoming", "per_page": 50}
+    per_course = await asyncio.gather(
+        *(
+            _get(
+                f"/api/v1/courses/{c['id']}/assignments",
+                params={"bucket": "upcoming", "per_page": _ASSIGNMENTS_PER_PAGE},
+            )
+            for c in courses
         )
-        for a in assigns:
-            due_at = a.get("due_at")
-            due_dt = datetime.fromisoformat(due_at.replace("Z", "+00:00")) if due_at else None
-            if due_dt and due_after and due_dt < due_after:
-                continue
-            if due_dt and due_before and due_dt > due_before:
-                continue
-
-            items.append(
-                AcademicItem(
-                    id=f"canvas_assignment:{a.get('id')}",
-                    title=a.get("name", "(no title)"),
-                    type="assignment",
-                    courseCode=str(course_code) if course_code else None,
-                    dueDate=due_dt,
-                    source="wu_canvas",
-                    url=a.get("html_url"),
-                    status="open",
-                    metadata={"points_possible": a.get("points_possible")},
-                )
+    )
+
+    all_items: List[AcademicItem] = []
+    complete_courses = []
+    for c, assigns in zip(courses, per_course):
+        course_code = c.get("course_code") or c.get("name")
+        course_items = [
+            AcademicItem(
+                id=f"canvas_assignment:{a.get('id')}",
+                title=a.get("name", "(no title)"),
+                type="assignment",
+                courseCode=str(course_code) if course_code else None,
+                dueDate=datetime.fromisoformat(a["due_at"].replace("Z", "+00:00")) if a.get("due_at") else None,
+                source="wu_canvas",
+                url=a.get("html_url"),
+                status="open",
+                metadata={"points_possible": a.get("points_possible")},
             )
+            for a in assigns
+        ]
+        all_items.extend(course_items)
+        # A full page may be truncated, so only reconcile courses we saw completely.
+        if len(assigns) < _ASSIGNMENTS_PER_PAGE:
+            complete_courses.append((str(course_code) if course_code else "", [i.id for i in course_items]))
+
+    def _sync_index() -> None:
+        index_academic(all_items)
+        # The upcoming bucket only covers future due dates; leave past and undated rows alone.
+        now = datetime.now(timezone.utc)
+        for course_code, ids in complete_courses:
+            prune("wu_canvas", ids, course=course_code, at_from=now)
+
+    await asyncio.to_thread(_sync_index)
 
+    items = [
+        i
+        for i in all_items
+        if not (i.dueDate and due_after and i.dueDate < due_after)
+        and not (i.dueDate and due_before and i.dueDate > due_before)
+    ]
     return items[: max(1, limit)]
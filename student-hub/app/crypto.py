@@ -1,12 +1,20 @@
-import os
-from cryptography.fernet import Fernet
+from functools import lru_cache
 
+from .settings import get_settings
 
-def _fernet() -> Fernet:
-    key = os.getenv("MASTER_KEY", "").encode()
+
+@lru_cache(maxsize=1)
+def _fernet_for(key: str):
+    from cryptography.fernet import Fernet
+
+    return Fernet(key.encode())
+
+
+def _fernet():
+    key = get_settings().master_key
     if not key:
         raise RuntimeError("MASTER_KEY is missing. Set it in your .env")
-    return Fernet(key)
+    return _fernet_for(key)
 
 
 def encrypt_text(plain: str) -> str:
@@ -6,12 +6,64 @@ DB_PATH = Path("student_hub.sqlite")
 
 def init_db() -> None:
     with sqlite3.connect(DB_PATH) as con:
-        con.execute(
+        con.executescript(
             """
           CREATE TABLE IF NOT EXISTS kv (
             k TEXT PRIMARY KEY,
             v TEXT NOT NULL
-          )
+          );
+
+          CREATE TABLE IF NOT EXISTS search_docs (
+            rowid INTEGER PRIMARY KEY,
+            source TEXT NOT NULL,
+            item_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            title TEXT NOT NULL,
+            body TEXT NOT NULL DEFAULT '',
+            course TEXT NOT NULL DEFAULT '',
+            at TEXT,
+            end_at TEXT,
+            url TEXT,
+            vevent TEXT,
+            all_day INTEGER NOT NULL DEFAULT 0,
+            UNIQUE(source, item_id)
+          );
+          CREATE INDEX IF NOT EXISTS search_docs_at ON search_docs(at);
+
+          CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+            title, body, course,
+            content='search_docs', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2'
+          );
+
+          CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+            INSERT INTO search_fts(rowid, title, body, course)
+            VALUES (new.rowid, new.title, new.body, new.course);
+          END;
+          CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+            INSERT INTO search_fts(search_fts, rowid, title, body, course)
+            VALUES ('delete', old.rowid, old.title, old.body, old.course);
+          END;
+          CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE ON search_docs BEGIN
+            INSERT INTO search_fts(search_fts, rowid, title, body, course)
+            VALUES ('delete', old.rowid, old.title, old.body, old.course);
+            INSERT INTO search_fts(rowid, title, body, course)
+            VALUES (new.rowid, new.title, new.body, new.course);
+          END;
+        """
+        )
+        # Any change to indexed items bumps search_rev, which the ICS export uses as its ETag.
+        con.executescript(
+            """
+          CREATE TRIGGER IF NOT EXISTS search_docs_rev_ai AFTER INSERT ON search_docs BEGIN
+            INSERT INTO kv(k,v) VALUES('search_rev','1') ON CONFLICT(k) DO UPDATE SET v=v+1;
+          END;
+          CREATE TRIGGER IF NOT EXISTS search_docs_rev_ad AFTER DELETE ON search_docs BEGIN
+            INSERT INTO kv(k,v) VALUES('search_rev','1') ON CONFLICT(k) DO UPDATE SET v=v+1;
+          END;
+          CREATE TRIGGER IF NOT EXISTS search_docs_rev_au AFTER UPDATE ON search_docs BEGIN
+            INSERT INTO kv(k,v) VALUES('search_rev','1') ON CONFLICT(k) DO UPDATE SET v=v+1;
+          END;
         """
         )
         con.commit()
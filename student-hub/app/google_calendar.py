@@ -1,30 +1,80 @@
+from __future__ import annotations
+
+import asyncio
 import json
-import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Optional
-
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from typing import TYPE_CHECKING, List, Optional
 
+from .breaker import get_breaker
 from .crypto import encrypt_text, decrypt_text
 from .db import kv_get, kv_set
 from .models import CalendarEvent, CalendarEventCreate, CalendarEventPatch
+from .search import index_events, prune, remove
+from .settings import get_settings
+from .singleflight import flight, make_key
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import Flow
 
 TOKEN_KEY = "google_token"
 
+# googleapiclient and google-auth only do blocking I/O, so every Google call runs
+# on this bounded pool instead of Starlette's shared threadpool.
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().google_max_workers, thread_name_prefix="google"
+        )
+    return _executor
+
+
+async def run_blocking(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+def _trips(e: BaseException) -> bool:
+    import httplib2
+    from google.auth.exceptions import TransportError
+    from googleapiclient.errors import HttpError
+
+    if isinstance(e, HttpError):
+        return e.resp.status >= 500 or e.resp.status == 429
+    # Only transport-level problems count; bad credentials, a changed MASTER_KEY or
+    # unexpected payloads are not outages.
+    return isinstance(
+        e, (TransportError, socket.timeout, TimeoutError, ConnectionError, httplib2.ServerNotFoundError)
+    )
+
+
+def _breaker():
+    return get_breaker("google", trips=_trips)
+
 
 def _scopes() -> List[str]:
-    raw = os.getenv("GOOGLE_SCOPES", "")
-    return [s.strip() for s in raw.split() if s.strip()]
+    return list(get_settings().google_scopes)
 
 
 def get_flow() -> Flow:
-    client_secrets = os.getenv("GOOGLE_CLIENT_SECRETS", "client_secret.json")
-    redirect_uri = os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:8000/connect/google/callback")
-    flow = Flow.from_client_secrets_file(client_secrets, scopes=_scopes())
-    flow.redirect_uri = redirect_uri
+    from google_auth_oauthlib.flow import Flow
+
+    s = get_settings()
+    flow = Flow.from_client_secrets_file(s.google_client_secrets, scopes=_scopes())
+    flow.redirect_uri = s.google_redirect_uri
     return flow
 
 
@@ -41,9 +91,17 @@ def save_token(creds: Credentials) -> None:
 
 
 def load_credentials() -> Optional[Credentials]:
+    # Parallel Google calls would otherwise each refresh an expired token.
+    return flight.do(make_key("google.credentials"), _load_credentials)
+
+
+def _load_credentials() -> Optional[Credentials]:
     enc = kv_get(TOKEN_KEY)
     if not enc:
         return None
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
     data = json.loads(decrypt_text(enc))
     creds = Credentials(**data)
     if creds and creds.expired and creds.refresh_token:
@@ -53,15 +111,17 @@ def load_credentials() -> Optional[Credentials]:
 
 
 def _svc():
+    from googleapiclient.discovery import build
+
     creds = load_credentials()
     if not creds:
         raise RuntimeError("Google not connected. Visit /connect/google/start in a browser.")
     return build("calendar", "v3", credentials=creds)
 
 
-def list_events(time_min: Optional[datetime], time_max: Optional[datetime], max_results: int) -> List[CalendarEvent]:
+def _list_events(time_min: Optional[datetime], time_max: Optional[datetime], max_results: int) -> List[CalendarEvent]:
     svc = _svc()
-    cal_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")
+    cal_id = get_settings().google_calendar_id
 
     params = {"calendarId": cal_id, "singleEvents": True, "orderBy": "startTime", "maxResults": max_results}
     if time_min:
@@ -88,15 +148,19 @@ def list_events(time_min: Optional[datetime], time_max: Optional[datetime], max_
                 start=start_dt,
                 end=end_dt,
                 location=e.get("location"),
-                metadata={"htmlLink": e.get("htmlLink")},
+                metadata={"htmlLink": e.get("htmlLink"), "allDay": "T" not in start},
             )
         )
+    index_events(items)
+    # A short page is the complete set for the window, so drop events deleted upstream.
+    if len(items) < max_results:
+        prune("google", [e.id for e in items], at_from=time_min, at_to=time_max)
     return items
 
 
-def create_event(body: CalendarEventCreate) -> CalendarEvent:
+def _create_event(body: CalendarEventCreate) -> CalendarEvent:
     svc = _svc()
-    cal_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")
+    cal_id = get_settings().google_calendar_id
     ev = {
         "summary": body.summary,
         "description": body.description,
@@ -105,7 +169,7 @@ def create_event(body: CalendarEventCreate) -> CalendarEvent:
         "end": {"dateTime": body.end.isoformat()},
     }
     created = svc.events().insert(calendarId=cal_id, body=ev).execute()
-    return CalendarEvent(
+    event = CalendarEvent(
         id=created["id"],
         summary=created.get("summary", body.summary),
         description=created.get("description"),
@@ -114,11 +178,13 @@ def create_event(body: CalendarEventCreate) -> CalendarEvent:
         location=created.get("location"),
         metadata={"htmlLink": created.get("htmlLink")},
     )
+    index_events([event])
+    return event
 
 
-def patch_event(event_id: str, body: CalendarEventPatch) -> CalendarEvent:
+def _patch_event(event_id: str, body: CalendarEventPatch) -> CalendarEvent:
     svc = _svc()
-    cal_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")
+    cal_id = get_settings().google_calendar_id
     ev = svc.events().get(calendarId=cal_id, eventId=event_id).execute()
     if body.summary is not None:
         ev["summary"] = body.summary
@@ -131,7 +197,7 @@ def patch_event(event_id: str, body: CalendarEventPatch) -> CalendarEvent:
     if body.end is not None:
         ev["end"] = {"dateTime": body.end.isoformat()}
     updated = svc.events().update(calendarId=cal_id, eventId=event_id, body=ev).execute()
-    return CalendarEvent(
+    event = CalendarEvent(
         id=updated["id"],
         summary=updated.get("summary", "(no title)"),
         description=updated.get("description"),
@@ -140,9 +206,29 @@ def patch_event(event_id: str, body: CalendarEventPatch) -> CalendarEvent:
         location=updated.get("location"),
         metadata={"htmlLink": updated.get("htmlLink")},
     )
+    index_events([event])
+    return event
 
 
-def delete_event(event_id: str) -> None:
+def _delete_event(event_id: str) -> None:
     svc = _svc()
-    cal_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")
+    cal_id = get_settings().google_calendar_id
     svc.events().delete(calendarId=cal_id, eventId=event_id).execute()
+    remove("google", event_id)
+
+
+async def list_events(time_min: Optional[datetime], time_max: Optional[datetime], max_results: int) -> List[CalendarEvent]:
+    key = make_key("google", time_min, time_max, max_results)
+    return await flight.ado(key, _breaker().call, key, run_blocking, _list_events, time_min, time_max, max_results)
+
+
+async def create_event(body: CalendarEventCreate) -> CalendarEvent:
+    return await _breaker().call(None, run_blocking, _create_event, body)
+
+
+async def patch_event(event_id: str, body: CalendarEventPatch) -> CalendarEvent:
+    return await _breaker().call(None, run_blocking, _patch_event, event_id, body)
+
+
+async def delete_event(event_id: str) -> None:
+    await _breaker().call(None, run_blocking, _delete_event, event_id)
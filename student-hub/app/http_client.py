@@ -0,0 +1,56 @@
+from typing import Optional
+
+import httpx
+
+from .settings import get_settings
+
+# One connection pool (the transport) is shared by every upstream client in the
+# process. Clients built on top of it only carry per-upstream defaults.
+_transport: Optional[httpx.AsyncHTTPTransport] = None
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    s = get_settings()
+    return httpx.Limits(
+        max_connections=s.http_max_connections,
+        max_keepalive_connections=s.http_max_keepalive,
+        keepalive_expiry=30.0,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(get_settings().http_timeout_seconds)
+
+
+def transport() -> httpx.AsyncHTTPTransport:
+    global _transport
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(limits=_limits())
+    return _transport
+
+
+def new_client(**kwargs) -> httpx.AsyncClient:
+    kwargs.setdefault("timeout", _timeout())
+    return httpx.AsyncClient(transport=transport(), **kwargs)
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = new_client(follow_redirects=True)
+    return _client
+
+
+def is_upstream_failure(e: BaseException) -> bool:
+    if isinstance(e, httpx.HTTPStatusError):
+        return e.response.status_code >= 500 or e.response.status_code == 429
+    return isinstance(e, httpx.TransportError)
+
+
+async def aclose() -> None:
+    global _transport, _client
+    if _transport is not None:
+        await _transport.aclose()
+    _transport = None
+    _client = None
@@ -1,62 +1,105 @@
-import os
+import asyncio
 from datetime import datetime
 from typing import List, Optional
+from urllib.parse import urlsplit
 
-import requests
-from dateutil import tz
-from icalendar import Calendar
-
+from .breaker import get_breaker
+from .http_client import get_client, is_upstream_failure
 from .models import AcademicItem
+from .search import index_academic, prune
+from .settings import get_settings
+from .singleflight import flight, make_key
 
 
 def _ical_urls() -> List[str]:
-    raw = os.getenv("WU_ICAL_URLS", "")
-    urls = [u.strip() for u in raw.split(",") if u.strip()]
-    return urls
+    return list(get_settings().ical_urls)
+
+
+async def _download(url: str) -> str:
+    r = await get_client().get(url)
+    r.raise_for_status()
+    return r.text
 
 
-def list_ical_items(from_dt: Optional[datetime], to_dt: Optional[datetime]) -> List[AcademicItem]:
+def _parse_feed(url: str, text: str) -> List[AcademicItem]:
+    from dateutil import tz
+    from icalendar import Calendar
+
     items: List[AcademicItem] = []
-    for url in _ical_urls():
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        cal = Calendar.from_ical(r.text)
+    cal = Calendar.from_ical(text)
 
-        for comp in cal.walk():
-            if comp.name != "VEVENT":
-                continue
-            uid = str(comp.get("UID", ""))
-            summary = str(comp.get("SUMMARY", "(no title)"))
-            dtstart = comp.get("DTSTART").dt
-            dtend = comp.get("DTEND").dt if comp.get("DTEND") else None
-            if isinstance(dtstart, datetime):
-                start = dtstart
+    for comp in cal.walk():
+        if comp.name != "VEVENT":
+            continue
+        uid = str(comp.get("UID", ""))
+        # Overrides of a recurring event share its UID; RECURRENCE-ID tells them apart.
+        if comp.get("RECURRENCE-ID"):
+            uid = f"{uid}:{comp.get('RECURRENCE-ID').to_ical().decode()}"
+        summary = str(comp.get("SUMMARY", "(no title)"))
+        dtstart = comp.get("DTSTART").dt
+        dtend = comp.get("DTEND").dt if comp.get("DTEND") else None
+        if isinstance(dtstart, datetime):
+            start = dtstart
+        else:
+            start = datetime(dtstart.year, dtstart.month, dtstart.day, tzinfo=tz.UTC)
+        if dtend:
+            if isinstance(dtend, datetime):
+                end = dtend
             else:
-                start = datetime(dtstart.year, dtstart.month, dtstart.day, tzinfo=tz.UTC)
-            if dtend:
-                if isinstance(dtend, datetime):
-                    end = dtend
-                else:
-                    end = datetime(dtend.year, dtend.month, dtend.day, tzinfo=tz.UTC)
-            else:
-                end = None
+                end = datetime(dtend.year, dtend.month, dtend.day, tzinfo=tz.UTC)
+        else:
+            end = None
 
-            if from_dt and start < from_dt:
-                continue
-            if to_dt and start > to_dt:
-                continue
+        metadata = {"allDay": not isinstance(dtstart, datetime)}
+        if comp.get("LOCATION"):
+            metadata["location"] = str(comp.get("LOCATION"))
+        if comp.get("DESCRIPTION"):
+            metadata["description"] = str(comp.get("DESCRIPTION"))
 
-            items.append(
-                AcademicItem(
-                    id=f"wu_ical:{uid}",
-                    title=summary,
-                    type="timetable",
-                    start=start,
-                    end=end,
-                    source="wu_vvz",
-                    url=url,
-                    status=None,
-                    metadata={},
-                )
+        items.append(
+            AcademicItem(
+                id=f"wu_ical:{uid}",
+                title=summary,
+                type="timetable",
+                start=start,
+                end=end,
+                source="wu_vvz",
+                url=url,
+                status=None,
+                metadata=metadata,
             )
+        )
+    index_academic(items)
+    # The feed is a full snapshot: anything no longer in it was cancelled.
+    prune("wu_vvz", [i.id for i in items], url=url)
+    return items
+
+
+async def _load(url: str) -> List[AcademicItem]:
+    text = await _download(url)
+    # Parsing large feeds is CPU-bound; keep it off the event loop.
+    return await asyncio.to_thread(_parse_feed, url, text)
+
+
+async def _fetch(url: str) -> List[AcademicItem]:
+    key = make_key("ical", url)
+    breaker = get_breaker(f"ical:{urlsplit(url).netloc}", trips=is_upstream_failure)
+    return await flight.ado(key, breaker.call, key, _load, url)
+
+
+async def list_ical_items(from_dt: Optional[datetime], to_dt: Optional[datetime]) -> List[AcademicItem]:
+    results = await asyncio.gather(*(_fetch(url) for url in _ical_urls()), return_exceptions=True)
+    feeds = [r for r in results if not isinstance(r, BaseException)]
+    # Breakers are per host: one dead or open feed must not hide the healthy ones.
+    if results and not feeds:
+        raise results[0]
+
+    items: List[AcademicItem] = []
+    for feed in feeds:
+        for item in feed:
+            if from_dt and item.start < from_dt:
+                continue
+            if to_dt and item.start > to_dt:
+                continue
+            items.append(item)
     return items
@@ -0,0 +1,114 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from .db import DB_PATH, kv_get
+
+PRODID = "-//Student Productivity Hub//Export//EN"
+WINDOW_DAYS = 90
+
+_HEADER = (
+    "BEGIN:VCALENDAR\r\n"
+    "VERSION:2.0\r\n"
+    f"PRODID:{PRODID}\r\n"
+    "CALSCALE:GREGORIAN\r\n"
+    "METHOD:PUBLISH\r\n"
+    "X-WR-CALNAME:Student Hub\r\n"
+)
+_FOOTER = "END:VCALENDAR\r\n"
+
+
+def _escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line: str) -> str:
+    # RFC 5545: content lines are at most 75 octets, continued with CRLF + space.
+    out, chunk, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            out.append(chunk)
+            chunk, size = " ", 1
+        chunk += ch
+        size += n
+    out.append(chunk)
+    return "\r\n".join(out) + "\r\n"
+
+
+def _stamp(iso: str) -> str:
+    return datetime.fromisoformat(iso).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _date_prop(name: str, iso: str, all_day: bool) -> str:
+    # Date-only items are stored as UTC midnight; emit them as floating dates so
+    # subscribers show them as all-day instead of at 00:00Z.
+    if all_day:
+        return f"{name};VALUE=DATE:{datetime.fromisoformat(iso).strftime('%Y%m%d')}"
+    return f"{name}:{_stamp(iso)}"
+
+
+def render_vevent(
+    source: str,
+    item_id: str,
+    title: str,
+    body: str,
+    course: str,
+    at: Optional[str],
+    end_at: Optional[str],
+    url: Optional[str],
+    all_day: bool = False,
+) -> Optional[str]:
+    if not at:
+        return None
+    summary = f"{course}: {title}" if course and not title.startswith(course) else title
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{_escape(source)}-{_escape(item_id)}@student-hub",
+        f"DTSTAMP:{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
+        _date_prop("DTSTART", at, all_day),
+    ]
+    if end_at and end_at > at:
+        lines.append(_date_prop("DTEND", end_at, all_day))
+    lines.append(f"SUMMARY:{_escape(summary)}")
+    if body:
+        lines.append(f"DESCRIPTION:{_escape(body)}")
+    if url:
+        lines.append(f"URL:{url}")
+    lines.append(f"CATEGORIES:{_escape(source)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def _window_start() -> str:
+    start = datetime.now(timezone.utc).date() - timedelta(days=WINDOW_DAYS)
+    return datetime(start.year, start.month, start.day, tzinfo=timezone.utc).isoformat()
+
+
+def feed_etag() -> str:
+    return f'"{kv_get("search_rev") or 0}-{_window_start()[:10]}"'
+
+
+def stream_feed(batch_size: int = 200) -> Iterator[str]:
+    yield _HEADER
+    # Starlette may resume this generator on different threadpool workers.
+    con = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        cur = con.execute(
+            "SELECT vevent FROM search_docs WHERE vevent IS NOT NULL AND at >= ? ORDER BY at",
+            (_window_start(),),
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield "".join(row[0] for row in rows)
+    finally:
+        con.close()
+    yield _FOOTER
@@ -1,15 +1,27 @@
-import os
+import asyncio
 import secrets
+from contextlib import asynccontextmanager
 from datetime import datetime, date, timedelta, timezone
 from typing import Optional
 
-from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, Header, HTTPException
-from fastapi.responses import PlainTextResponse, RedirectResponse
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
 
+from .breaker import CircuitOpenError, breaker_states
 from .canvas_client import list_upcoming_assignments
 from .db import init_db, kv_get, kv_set
-from .google_calendar import create_event, delete_event, get_flow, list_events, patch_event, save_token
+from .google_calendar import (
+    create_event,
+    delete_event,
+    get_flow,
+    list_events,
+    patch_event,
+    run_blocking,
+    save_token,
+    shutdown_executor,
+)
+from .http_client import aclose as close_http
+from .ics_export import feed_etag, stream_feed
 from .ical_client import list_ical_items
 from .models import (
     AcademicItem,
@@ -20,17 +32,39 @@ from .models import (
     NotionTask,
     NotionTaskCreate,
     NotionTaskPatch,
+    SearchHit,
 )
 from .notion_tasks import create_task, list_tasks, patch_task
+from .search import search
+from .settings import get_settings
+from .singleflight import flight
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse configuration once and create tables before serving; upstream client
+    # libraries are imported on first use, not here.
+    get_settings()
+    init_db()
+    yield
+    await close_http()
+    shutdown_executor()
+
 
-load_dotenv()
-init_db()
+app = FastAPI(title="Student Productivity Hub", version="1.0.0", lifespan=lifespan)
 
-app = FastAPI(title="Student Productivity Hub", version="1.0.0")
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
 
 
-def require_api_key(x_api_key: str = Header(default="", alias="X-API-Key")):
-    expected = os.getenv("HUB_API_KEY", "")
+async def require_api_key(x_api_key: str = Header(default="", alias="X-API-Key")):
+    expected = get_settings().hub_api_key
     if not expected:
         raise RuntimeError("HUB_API_KEY missing")
     if x_api_key != expected:
@@ -38,10 +72,15 @@ def require_api_key(x_api_key: str = Header(default="", alias="X-API-Key")):
 
 
 @app.get("/health", response_class=PlainTextResponse)
-def health():
+async def health():
     return "ok"
 
 
+@app.get("/metrics", dependencies=[Depends(require_api_key)])
+async def metrics():
+    return {"singleflight": flight.stats(), "breakers": breaker_states()}
+
+
 @app.get("/privacy", response_class=PlainTextResponse)
 def privacy():
     with open("static/privacy.md", "r", encoding="utf-8") as f:
@@ -55,37 +94,43 @@ def terms():
 
 
 @app.get("/connect/google/start")
-def connect_google_start():
-    flow = get_flow()
+async def connect_google_start():
     state = secrets.token_urlsafe(24)
-    kv_set("google_oauth_state", state)
-    auth_url, _ = flow.authorization_url(
-        access_type="offline",
-        include_granted_scopes="true",
-        prompt="consent",
-        state=state,
-    )
-    return RedirectResponse(auth_url)
+
+    def _auth_url() -> str:
+        kv_set("google_oauth_state", state)
+        flow = get_flow()
+        auth_url, _ = flow.authorization_url(
+            access_type="offline",
+            include_granted_scopes="true",
+            prompt="consent",
+            state=state,
+        )
+        return auth_url
+
+    return RedirectResponse(await run_blocking(_auth_url))
 
 
 @app.get("/connect/google/callback")
-def connect_google_callback(code: str, state: str):
-    expected = kv_get("google_oauth_state")
-    if not expected or state != expected:
-        raise HTTPException(status_code=400, detail="Invalid OAuth state")
-
-    flow = get_flow()
-    flow.fetch_token(code=code)
-    creds = flow.credentials
-    save_token(creds)
+async def connect_google_callback(code: str, state: str):
+    def _exchange() -> None:
+        expected = kv_get("google_oauth_state")
+        if not expected or state != expected:
+            raise HTTPException(status_code=400, detail="Invalid OAuth state")
+        flow = get_flow()
+        flow.fetch_token(code=code)
+        creds = flow.credentials
+        save_token(creds)
+
+    await run_blocking(_exchange)
     return PlainTextResponse("Google Calendar connected! You can close this tab and use the GPT.")
 
 
 @app.get("/calendar/events", response_model=list[CalendarEvent], dependencies=[Depends(require_api_key)])
-def calendar_list(
+async def calendar_list(
     timeMin: Optional[datetime] = None, timeMax: Optional[datetime] = None, maxResults: int = 20
 ):
-    return list_events(timeMin, timeMax, maxResults)
+    return await list_events(timeMin, timeMax, maxResults)
 
 
 @app.post(
@@ -94,28 +139,28 @@ def calendar_list(
     status_code=201,
     dependencies=[Depends(require_api_key)],
 )
-def calendar_create(body: CalendarEventCreate):
-    return create_event(body)
+async def calendar_create(body: CalendarEventCreate):
+    return await create_event(body)
 
 
 @app.patch(
     "/calendar/events/{eventId}", response_model=CalendarEvent, dependencies=[Depends(require_api_key)]
 )
-def calendar_patch(eventId: str, body: CalendarEventPatch):
-    return patch_event(eventId, body)
+async def calendar_patch(eventId: str, body: CalendarEventPatch):
+    return await patch_event(eventId, body)
 
 
 @app.delete("/calendar/events/{eventId}", status_code=204, dependencies=[Depends(require_api_key)])
-def calendar_delete(eventId: str):
-    delete_event(eventId)
+async def calendar_delete(eventId: str):
+    await delete_event(eventId)
     return None
 
 
 @app.get("/notion/tasks", response_model=list[NotionTask], dependencies=[Depends(require_api_key)])
-def notion_list(
+async def notion_list(
     status: Optional[str] = None, dueBefore: Optional[datetime] = None, dueAfter: Optional[datetime] = None, limit: int = 50
 ):
-    return list_tasks(status=status, due_before=dueBefore, due_after=dueAfter, limit=limit)
+    return await list_tasks(status=status, due_before=dueBefore, due_after=dueAfter, limit=limit)
 
 
 @app.post(
@@ -124,15 +169,15 @@ def notion_list(
     status_code=201,
     dependencies=[Depends(require_api_key)],
 )
-def notion_create(body: NotionTaskCreate):
-    return create_task(body)
+async def notion_create(body: NotionTaskCreate):
+    return await create_task(body)
 
 
 @app.patch(
     "/notion/tasks/{taskId}", response_model=NotionTask, dependencies=[Depends(require_api_key)]
 )
-def notion_patch(taskId: str, body: NotionTaskPatch):
-    return patch_task(taskId, body)
+async def notion_patch(taskId: str, body: NotionTaskPatch):
+    return await patch_task(taskId, body)
 
 
 @app.get(
@@ -140,8 +185,8 @@ def notion_patch(taskId: str, body: NotionTaskPatch):
     response_model=list[AcademicItem],
     dependencies=[Depends(require_api_key)],
 )
-def canvas_items(dueBefore: Optional[datetime] = None, dueAfter: Optional[datetime] = None, limit: int = 50):
-    return list_upcoming_assignments(due_after=dueAfter, due_before=dueBefore, limit=limit)
+async def canvas_items(dueBefore: Optional[datetime] = None, dueAfter: Optional[datetime] = None, limit: int = 50):
+    return await list_upcoming_assignments(due_after=dueAfter, due_before=dueBefore, limit=limit)
 
 
 @app.get(
@@ -149,37 +194,25 @@ def canvas_items(dueBefore: Optional[datetime] = None, dueAfter: Optional[dateti
     response_model=list[AcademicItem],
     dependencies=[Depends(require_api_key)],
 )
-def vvz_items(from_: Optional[datetime] = None, to: Optional[datetime] = None):
-    return list_ical_items(from_dt=from_, to_dt=to)
+async def vvz_items(from_: Optional[datetime] = None, to: Optional[datetime] = None):
+    return await list_ical_items(from_dt=from_, to_dt=to)
 
 
 @app.get("/overview/daily", response_model=DailyOverview, dependencies=[Depends(require_api_key)])
-def overview_daily(dateStr: str):
+async def overview_daily(dateStr: str):
     d = date.fromisoformat(dateStr)
     start = datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
     end = start + timedelta(days=1)
 
-    cal = []
-    try:
-        cal = list_events(start, end, max_results=50)
-    except Exception:
-        cal = []
-
-    notion = []
-    try:
-        notion = list_tasks(status=None, due_before=end, due_after=start, limit=100)
-    except Exception:
-        notion = []
-
-    acad = []
-    try:
-        acad.extend(list_upcoming_assignments(due_after=start, due_before=end, limit=100))
-    except Exception:
-        pass
-    try:
-        acad.extend(list_ical_items(from_dt=start, to_dt=end))
-    except Exception:
-        pass
+    results = await asyncio.gather(
+        list_events(start, end, max_results=50),
+        list_tasks(status=None, due_before=end, due_after=start, limit=100),
+        list_upcoming_assignments(due_after=start, due_before=end, limit=100),
+        list_ical_items(from_dt=start, to_dt=end),
+        return_exceptions=True,
+    )
+    cal, notion, canvas, ical = [[] if isinstance(r, Exception) else r for r in results]
+    acad = canvas + ical
 
     summary = f"{len(cal)} calendar events, {len(notion)} Notion tasks, {len(acad)} academic items."
     return DailyOverview(
@@ -187,9 +220,38 @@ def overview_daily(dateStr: str):
     )
 
 
+@app.get("/search", response_model=list[SearchHit], dependencies=[Depends(require_api_key)])
+async def search_items(
+    q: str,
+    from_: Optional[datetime] = Query(default=None, alias="from"),
+    to: Optional[datetime] = None,
+    source: Optional[str] = None,
+    limit: int = 20,
+):
+    # Served from the local index only; it is filled as upstream data passes through.
+    return await asyncio.to_thread(search, q, from_dt=from_, to_dt=to, source=source, limit=limit)
+
+
+@app.get("/export/calendar.ics")
+async def export_calendar(token: str = "", if_none_match: str = Header(default="", alias="If-None-Match")):
+    # Calendar apps cannot send X-API-Key, so the feed has its own URL token.
+    expected = get_settings().ics_feed_token
+    if not expected:
+        raise HTTPException(status_code=404, detail="ICS export disabled")
+    if not secrets.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid feed token")
+
+    etag = await asyncio.to_thread(feed_etag)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=300"}
+    candidates = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+    return StreamingResponse(stream_feed(), media_type="text/calendar; charset=utf-8", headers=headers)
+
+
 @app.post("/webhooks/samsung/reminders", dependencies=[Depends(require_api_key)])
-def webhook_samsung(payload: dict):
-    if os.getenv("ALLOW_WEBHOOKS", "false").lower() != "true":
+async def webhook_samsung(payload: dict):
+    if not get_settings().allow_webhooks:
         raise HTTPException(status_code=403, detail="Webhooks disabled")
     title = payload.get("title")
     if not title:
@@ -199,7 +261,7 @@ def webhook_samsung(payload: dict):
         est = payload.get("estMinutes")
         course = payload.get("courseCode")
         body = NotionTaskCreate(title=title, dueDate=due, estMinutes=est, courseCode=course)
-        task = create_task(body)
+        task = await create_task(body)
         return {"ok": True, "createdIn": "notion", "taskId": task.id}
     except Exception:
         return {"ok": True, "createdIn": "none"}
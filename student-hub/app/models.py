@@ -79,3 +79,15 @@ class DailyOverview(BaseModel):
     notionTasks: List[NotionTask] = Field(default_factory=list)
     academicItems: List[AcademicItem] = Field(default_factory=list)
     summaryText: str = ""
+
+
+class SearchHit(BaseModel):
+    id: str
+    source: str
+    type: str
+    title: str
+    snippet: Optional[str] = None
+    courseCode: Optional[str] = None
+    at: Optional[datetime] = None
+    url: Optional[str] = None
+    score: float
@@ -1,34 +1,59 @@
-import os
+import asyncio
 from datetime import datetime
-from typing import List, Optional
-
-from notion_client import Client
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional
 
+from .breaker import get_breaker
+from .http_client import is_upstream_failure, new_client
 from .models import NotionTask, NotionTaskCreate, NotionTaskPatch
+from .search import index_tasks
+from .settings import get_settings
+from .singleflight import flight, make_key
+
+if TYPE_CHECKING:
+    from notion_client import AsyncClient
+
+
+@lru_cache(maxsize=1)
+def _client_for(token: str) -> "AsyncClient":
+    from notion_client import AsyncClient
+
+    # notion_client rewrites base_url, timeout and auth headers on the httpx client
+    # it is given, so it gets its own client on top of the shared connection pool.
+    timeout_ms = int(get_settings().http_timeout_seconds * 1000)
+    return AsyncClient(auth=token, timeout_ms=timeout_ms, client=new_client())
 
 
-def _client() -> Client:
-    token = os.getenv("NOTION_TOKEN", "")
+def _client() -> "AsyncClient":
+    token = get_settings().notion_token
     if not token:
         raise RuntimeError("NOTION_TOKEN missing")
-    return Client(auth=token)
+    return _client_for(token)
+
+
+def _trips(e: BaseException) -> bool:
+    from notion_client.errors import HTTPResponseError, RequestTimeoutError
+
+    if isinstance(e, RequestTimeoutError):
+        return True
+    if isinstance(e, HTTPResponseError):
+        return e.status >= 500 or e.status == 429
+    return is_upstream_failure(e)
+
+
+def _breaker():
+    return get_breaker("notion", trips=_trips)
 
 
 def _db_id() -> str:
-    db = os.getenv("NOTION_DATABASE_ID", "")
+    db = get_settings().notion_database_id
     if not db:
         raise RuntimeError("NOTION_DATABASE_ID missing")
     return db
 
 
 def _props():
-    return {
-        "title": os.getenv("NOTION_PROP_TITLE", "Name"),
-        "status": os.getenv("NOTION_PROP_STATUS", "Status"),
-        "due": os.getenv("NOTION_PROP_DUE", "Due"),
-        "est": os.getenv("NOTION_PROP_EST_MIN", "Est (min)"),
-        "course": os.getenv("NOTION_PROP_COURSE", "Course"),
-    }
+    return get_settings().notion_props
 
 
 def _extract_text_title(page: dict, prop_name: str) -> str:
@@ -54,6 +79,11 @@ def _extract_date(page: dict, prop_name: str) -> Optional[datetime]:
     return datetime.fromisoformat(s + "T00:00:00+00:00")
 
 
+def _is_date_only(page: dict, prop_name: str) -> bool:
+    d = page["properties"].get(prop_name, {}).get("date")
+    return bool(d and d.get("start") and "T" not in d["start"])
+
+
 def _extract_number(page: dict, prop_name: str) -> Optional[int]:
     prop = page["properties"].get(prop_name, {})
     n = prop.get("number")
@@ -68,11 +98,18 @@ def _extract_richtext(page: dict, prop_name: str) -> Optional[str]:
     return "".join([t.get("plain_text", "") for t in rt])
 
 
-def list_tasks(
+async def list_tasks(
     status: Optional[str] = None,
     due_before: Optional[datetime] = None,
     due_after: Optional[datetime] = None,
     limit: int = 50,
+) -> List[NotionTask]:
+    key = make_key("notion", status=status, due_before=due_before, due_after=due_after, limit=limit)
+    return await flight.ado(key, _breaker().call, key, _list_tasks, status, due_before, due_after, limit)
+
+
+async def _list_tasks(
+    status: Optional[str], due_before: Optional[datetime], due_after: Optional[datetime], limit: int
 ) -> List[NotionTask]:
     c = _client()
     db = _db_id()
@@ -90,7 +127,7 @@ def list_tasks(
     if filters:
         q["filter"] = {"and": filters} if len(filters) > 1 else filters[0]
 
-    resp = c.databases.query(**q)
+    resp = await c.databases.query(**q)
     tasks: List[NotionTask] = []
     for page in resp.get("results", []):
         tasks.append(
@@ -101,13 +138,18 @@ def list_tasks(
                 dueDate=_extract_date(page, p["due"]),
                 estMinutes=_extract_number(page, p["est"]),
                 courseCode=_extract_richtext(page, p["course"]),
-                metadata={"url": page.get("url")},
+                metadata={"url": page.get("url"), "allDay": _is_date_only(page, p["due"])},
             )
         )
+    await asyncio.to_thread(index_tasks, tasks)
     return tasks
 
 
-def create_task(body: NotionTaskCreate) -> NotionTask:
+async def create_task(body: NotionTaskCreate) -> NotionTask:
+    return await _breaker().call(None, _create_task, body)
+
+
+async def _create_task(body: NotionTaskCreate) -> NotionTask:
     c = _client()
     db = _db_id()
     p = _props()
@@ -123,8 +165,8 @@ def create_task(body: NotionTaskCreate) -> NotionTask:
     if body.courseCode:
         props[p["course"]] = {"rich_text": [{"text": {"content": body.courseCode}}]}
 
-    page = c.pages.create(parent={"database_id": db}, properties=props)
-    return NotionTask(
+    page = await c.pages.create(parent={"database_id": db}, properties=props)
+    task = NotionTask(
         id=page["id"],
         title=body.title,
         status=body.status,
@@ -133,9 +175,15 @@ def create_task(body: NotionTaskCreate) -> NotionTask:
         courseCode=body.courseCode,
         metadata={"url": page.get("url")},
     )
+    await asyncio.to_thread(index_tasks, [task])
+    return task
+
+
+async def patch_task(task_id: str, body: NotionTaskPatch) -> NotionTask:
+    return await _breaker().call(None, _patch_task, task_id, body)
 
 
-def patch_task(task_id: str, body: NotionTaskPatch) -> NotionTask:
+async def _patch_task(task_id: str, body: NotionTaskPatch) -> NotionTask:
     c = _client()
     p = _props()
 
@@ -151,18 +199,20 @@ def patch_task(task_id: str, body: NotionTaskPatch) -> NotionTask:
     if body.courseCode is not None:
         props[p["course"]] = {"rich_text": [{"text": {"content": body.courseCode}}]}
 
-    updated = c.pages.update(page_id=task_id, properties=props)
+    updated = await c.pages.update(page_id=task_id, properties=props)
     title = _extract_text_title(updated, p["title"])
     status = _extract_select(updated, p["status"])
     due = _extract_date(updated, p["due"])
     est = _extract_number(updated, p["est"])
     course = _extract_richtext(updated, p["course"])
-    return NotionTask(
+    task = NotionTask(
         id=task_id,
         title=title,
         status=status,
         dueDate=due,
         estMinutes=est,
         courseCode=course,
-        metadata={"url": updated.get("url")},
+        metadata={"url": updated.get("url"), "allDay": _is_date_only(updated, p["due"])},
     )
+    await asyncio.to_thread(index_tasks, [task])
+    return task
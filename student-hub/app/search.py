@@ -0,0 +1,207 @@
+import json
+import re
+import sqlite3
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from .db import DB_PATH
+from .ics_export import render_vevent
+from .models import AcademicItem, CalendarEvent, NotionTask, SearchHit
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Dropped from queries: as prefix terms they match almost everything.
+_STOPWORDS = frozenset(
+    """
+    a an and are at by for from in into is it my of on or the to with
+    am auf das der die ein eine im in mit und von zu zum zur
+    """.split()
+)
+
+# (source, item_id, type, title, body, course, at, end_at, url, all_day)
+_Doc = Tuple[str, str, str, str, str, str, Optional[str], Optional[str], Optional[str], bool]
+
+
+def _iso(dt: Optional[datetime]) -> Optional[str]:
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _upsert(docs: Iterable[_Doc]) -> None:
+    # Last doc per (source, item_id) wins so a batch never rewrites a row twice.
+    unique = {(d[0], d[1]): d for d in docs}
+    rows = [
+        (*d, render_vevent(d[0], d[1], d[3], d[4], d[5], d[6], d[7], d[8], d[9]))
+        for d in unique.values()
+    ]
+    if not rows:
+        return
+    with sqlite3.connect(DB_PATH) as con:
+        con.executemany(
+            """
+            INSERT INTO search_docs(source, item_id, type, title, body, course, at, end_at, url, all_day, vevent)
+            VALUES (?,?,?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(source, item_id) DO UPDATE SET
+              type=excluded.type, title=excluded.title, body=excluded.body,
+              course=excluded.course, at=excluded.at, end_at=excluded.end_at,
+              url=excluded.url, all_day=excluded.all_day, vevent=excluded.vevent
+            WHERE (type, title, body, course, at, end_at, url, all_day)
+              IS NOT (excluded.type, excluded.title, excluded.body, excluded.course,
+                      excluded.at, excluded.end_at, excluded.url, excluded.all_day)
+            """,
+            rows,
+        )
+        con.commit()
+
+
+def index_events(events: Iterable[CalendarEvent]) -> None:
+    _upsert(
+        (
+            "google",
+            e.id,
+            "event",
+            e.summary,
+            " ".join(x for x in (e.description, e.location) if x),
+            "",
+            _iso(e.start),
+            _iso(e.end),
+            e.metadata.get("htmlLink"),
+            bool(e.metadata.get("allDay")),
+        )
+        for e in events
+    )
+
+
+def index_tasks(tasks: Iterable[NotionTask]) -> None:
+    _upsert(
+        (
+            "notion",
+            t.id,
+            "task",
+            t.title,
+            "",
+            t.courseCode or "",
+            _iso(t.dueDate),
+            None,
+            t.metadata.get("url"),
+            bool(t.metadata.get("allDay")),
+        )
+        for t in tasks
+    )
+
+
+def index_academic(items: Iterable[AcademicItem]) -> None:
+    _upsert(
+        (
+            i.source,
+            i.id,
+            i.type,
+            i.title,
+            " ".join(str(i.metadata[k]) for k in ("location", "description") if i.metadata.get(k)),
+            i.courseCode or "",
+            _iso(i.dueDate or i.start),
+            _iso(i.end),
+            i.url,
+            bool(i.metadata.get("allDay")),
+        )
+        for i in items
+    )
+
+
+def remove(source: str, item_id: str) -> None:
+    with sqlite3.connect(DB_PATH) as con:
+        con.execute("DELETE FROM search_docs WHERE source=? AND item_id=?", (source, item_id))
+        con.commit()
+
+
+def prune(
+    source: str,
+    keep_ids: Iterable[str],
+    url: Optional[str] = None,
+    course: Optional[str] = None,
+    at_from: Optional[datetime] = None,
+    at_to: Optional[datetime] = None,
+) -> None:
+    """Delete `source` rows in the given scope that a complete upstream snapshot no longer has."""
+    sql = "DELETE FROM search_docs WHERE source=? AND item_id NOT IN (SELECT value FROM json_each(?))"
+    params: list = [source, json.dumps(list(keep_ids))]
+    if url is not None:
+        sql += " AND url=?"
+        params.append(url)
+    if course is not None:
+        sql += " AND course=?"
+        params.append(course)
+    if at_from:
+        sql += " AND at >= ?"
+        params.append(_iso(at_from))
+    if at_to:
+        sql += " AND at < ?"
+        params.append(_iso(at_to))
+    with sqlite3.connect(DB_PATH) as con:
+        con.execute(sql, params)
+        con.commit()
+
+
+def _match_expr(q: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax; the
+    # trailing * makes "stat" match "stats" and "statistics". Terms are ORed so
+    # natural phrases still match, and bm25 ranks items matching more terms first.
+    tokens = _TOKEN.findall(q.lower())
+    terms = [t for t in tokens if t not in _STOPWORDS] or tokens
+    return " OR ".join('"' + t + '"*' for t in dict.fromkeys(terms))
+
+
+def search(
+    q: str,
+    from_dt: Optional[datetime] = None,
+    to_dt: Optional[datetime] = None,
+    source: Optional[str] = None,
+    limit: int = 20,
+) -> List[SearchHit]:
+    expr = _match_expr(q)
+    if not expr:
+        return []
+
+    sql = """
+        SELECT d.item_id, d.source, d.type, d.title,
+               snippet(search_fts, 1, '[', ']', '…', 12),
+               d.course, d.at, d.url,
+               bm25(search_fts, 10.0, 2.0, 5.0) AS score
+        FROM search_fts
+        JOIN search_docs d ON d.rowid = search_fts.rowid
+        WHERE search_fts MATCH ?
+    """
+    params: list = [expr]
+    if from_dt:
+        sql += " AND d.at >= ?"
+        params.append(_iso(from_dt))
+    if to_dt:
+        sql += " AND d.at <= ?"
+        params.append(_iso(to_dt))
+    if source:
+        sql += " AND d.source = ?"
+        params.append(source)
+    sql += " ORDER BY score LIMIT ?"
+    params.append(min(max(limit, 1), 100))
+
+    with sqlite3.connect(DB_PATH) as con:
+        rows = con.execute(sql, params).fetchall()
+
+    return [
+        SearchHit(
+            id=item_id,
+            source=src,
+            type=typ,
+            title=title,
+            snippet=snip or None,
+            courseCode=course or None,
+            at=datetime.fromisoformat(at) if at else None,
+            url=url,
+            # bm25() is lower-is-better; flip it so clients can sort descending.
+            score=round(-score, 4),
+        )
+        for item_id, src, typ, title, snip, course, at, url, score in rows
+    ]
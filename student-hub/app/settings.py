@@ -0,0 +1,93 @@
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping, Tuple
+
+from dotenv import load_dotenv
+
+_BREAKER_UPSTREAMS = ("google", "notion", "canvas", "ical")
+
+
+@dataclass(frozen=True)
+class Settings:
+    hub_api_key: str = ""
+    master_key: str = ""
+    allow_webhooks: bool = False
+    ics_feed_token: str = ""
+
+    google_client_secrets: str = "client_secret.json"
+    google_redirect_uri: str = "http://localhost:8000/connect/google/callback"
+    google_scopes: Tuple[str, ...] = ()
+    google_calendar_id: str = "primary"
+    google_max_workers: int = 8
+
+    notion_token: str = ""
+    notion_database_id: str = ""
+    notion_props: Mapping[str, str] = field(default_factory=lambda: MappingProxyType({}))
+
+    canvas_base_url: str = ""
+    canvas_token: str = ""
+
+    ical_urls: Tuple[str, ...] = ()
+
+    http_max_connections: int = 200
+    http_max_keepalive: int = 50
+    http_timeout_seconds: float = 30.0
+
+    # upstream -> (failure threshold, cooldown seconds)
+    breakers: Mapping[str, Tuple[int, float]] = field(default_factory=lambda: MappingProxyType({}))
+
+    def breaker(self, upstream: str) -> Tuple[int, float]:
+        return self.breakers.get(upstream) or self.breakers.get("default", (5, 30.0))
+
+
+def _breakers() -> Mapping[str, Tuple[int, float]]:
+    threshold = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+    cooldown = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+    out = {"default": (threshold, cooldown)}
+    for upstream in _BREAKER_UPSTREAMS:
+        prefix = f"BREAKER_{upstream.upper()}_"
+        out[upstream] = (
+            int(os.getenv(prefix + "FAILURE_THRESHOLD", threshold)),
+            float(os.getenv(prefix + "COOLDOWN_SECONDS", cooldown)),
+        )
+    return MappingProxyType(out)
+
+
+def load_settings() -> Settings:
+    return Settings(
+        hub_api_key=os.getenv("HUB_API_KEY", ""),
+        master_key=os.getenv("MASTER_KEY", ""),
+        allow_webhooks=os.getenv("ALLOW_WEBHOOKS", "false").lower() == "true",
+        ics_feed_token=os.getenv("ICS_FEED_TOKEN", ""),
+        google_client_secrets=os.getenv("GOOGLE_CLIENT_SECRETS", "client_secret.json"),
+        google_redirect_uri=os.getenv("GOOGLE_REDIRECT_URI", "http://localhost:8000/connect/google/callback"),
+        google_scopes=tuple(s.strip() for s in os.getenv("GOOGLE_SCOPES", "").split() if s.strip()),
+        google_calendar_id=os.getenv("GOOGLE_CALENDAR_ID", "primary"),
+        google_max_workers=int(os.getenv("GOOGLE_MAX_WORKERS", "8")),
+        notion_token=os.getenv("NOTION_TOKEN", ""),
+        notion_database_id=os.getenv("NOTION_DATABASE_ID", ""),
+        notion_props=MappingProxyType(
+            {
+                "title": os.getenv("NOTION_PROP_TITLE", "Name"),
+                "status": os.getenv("NOTION_PROP_STATUS", "Status"),
+                "due": os.getenv("NOTION_PROP_DUE", "Due"),
+                "est": os.getenv("NOTION_PROP_EST_MIN", "Est (min)"),
+                "course": os.getenv("NOTION_PROP_COURSE", "Course"),
+            }
+        ),
+        canvas_base_url=os.getenv("CANVAS_BASE_URL", "").rstrip("/"),
+        canvas_token=os.getenv("CANVAS_TOKEN", ""),
+        ical_urls=tuple(u.strip() for u in os.getenv("WU_ICAL_URLS", "").split(",") if u.strip()),
+        http_max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "200")),
+        http_max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "50")),
+        http_timeout_seconds=float(os.getenv("HTTP_TIMEOUT_SECONDS", "30")),
+        breakers=_breakers(),
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    load_dotenv()
+    return load_settings()
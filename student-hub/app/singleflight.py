@@ -0,0 +1,97 @@
+import asyncio
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Hashable, Tuple
+
+
+def _norm(v: Any) -> Hashable:
+    if isinstance(v, datetime):
+        return v.astimezone(timezone.utc).isoformat() if v.tzinfo else v.isoformat()
+    if isinstance(v, dict):
+        return tuple(sorted((str(k), _norm(x)) for k, x in v.items() if x is not None))
+    if isinstance(v, (list, tuple, set)):
+        return tuple(_norm(x) for x in v)
+    return v
+
+
+def make_key(upstream: str, *args, **kwargs) -> Tuple[str, Hashable, Hashable]:
+    return (upstream, _norm(args), _norm(kwargs))
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class Group:
+    """Coalesces concurrent identical calls so only one reaches the upstream."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._started: Counter = Counter()
+        self._coalesced: Counter = Counter()
+
+    def _count(self, key: Hashable, coalesced: bool) -> None:
+        upstream = key[0] if isinstance(key, tuple) and key else str(key)
+        with self._lock:
+            (self._coalesced if coalesced else self._started)[upstream] += 1
+
+    def do(self, key: Hashable, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(key, coalesced=not leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        task = self._tasks.get(task_key)
+        self._count(key, coalesced=task is not None)
+
+        if task is None:
+            task = loop.create_task(fn(*args, **kwargs))
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda t: self._finish(task_key, t))
+
+        # Shield so one caller going away does not cancel the fetch for the rest.
+        return await asyncio.shield(task)
+
+    def _finish(self, task_key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(task_key) is task:
+            del self._tasks[task_key]
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            upstreams = set(self._started) | set(self._coalesced)
+            return {
+                u: {"calls": self._started[u], "coalesced": self._coalesced[u]} for u in sorted(upstreams)
+            }
+
+
+flight = Group()
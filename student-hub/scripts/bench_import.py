@@ -0,0 +1,87 @@
+"""Measure cold import time of app.main.
+
+Run from the student-hub directory:
+
+    python scripts/bench_import.py [--runs 10] [--top 15]
+
+Each run is a fresh interpreter using ``-X importtime``. The script reports the
+median cumulative import time of ``app.main``, the slowest modules of the last
+run, and fails if any heavy client library was imported eagerly.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+HEAVY = (
+    "googleapiclient.discovery",
+    "google_auth_oauthlib",
+    "notion_client",
+    "icalendar",
+    "cryptography",
+)
+
+_PROBE = (
+    "import sys, app.main; "
+    f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+)
+
+
+def _run_once() -> tuple[float, list[tuple[int, str]], list[str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: list[tuple[int, str]] = []
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative_us, name = int(parts[1]), parts[2].strip()
+        modules.append((cumulative_us, name))
+        if name == "app.main":
+            total_us = cumulative_us
+    eager = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1000.0, modules, eager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = []
+    modules: list[tuple[int, str]] = []
+    eager: list[str] = []
+    for _ in range(max(1, args.runs)):
+        ms, modules, eager = _run_once()
+        timings.append(ms)
+
+    print(
+        f"app.main import: median {statistics.median(timings):.1f} ms, "
+        f"min {min(timings):.1f} ms, max {max(timings):.1f} ms over {len(timings)} runs"
+    )
+    print("\nslowest modules (cumulative, last run):")
+    for cumulative_us, name in sorted(modules, reverse=True)[: args.top]:
+        print(f"  {cumulative_us / 1000.0:8.1f} ms  {name}")
+
+    if eager:
+        print(f"\nFAIL: imported eagerly: {', '.join(eager)}")
+        return 1
+    print("\nOK: no heavy client libraries imported at startup")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Regression check for GET /search query handling.
+
+Run from the student-hub directory:
+
+    python scripts/check_search.py
+
+Builds a throwaway index (the sqlite file is relative to the working
+directory, so this runs in a temp dir) and asserts that natural-language
+queries the GPT sends still find the right items.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CASES = {
+    "the stats assignment": "canvas_assignment:1",
+    "the lab in room 4": "wu_ical:lab-1",
+    "stats assignment": "canvas_assignment:1",
+    "lab room 4": "wu_ical:lab-1",
+}
+
+
+def main() -> int:
+    os.chdir(tempfile.mkdtemp())
+
+    from app.db import init_db
+    from app.models import AcademicItem
+    from app.search import index_academic, search
+
+    init_db()
+    when = datetime(2026, 10, 20, 10, tzinfo=timezone.utc)
+    index_academic(
+        [
+            AcademicItem(
+                id="canvas_assignment:1",
+                title="Stats Assignment 3",
+                type="assignment",
+                courseCode="STAT101",
+                dueDate=when,
+                source="wu_canvas",
+            ),
+            AcademicItem(
+                id="wu_ical:lab-1",
+                title="Biology Lab",
+                type="timetable",
+                start=when,
+                source="wu_vvz",
+                metadata={"location": "Room 4"},
+            ),
+        ]
+    )
+
+    failed = 0
+    for query, expected in CASES.items():
+        hits = search(query)
+        top = hits[0].id if hits else None
+        ok = top == expected
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {query!r} -> {top}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())